@@ -1,44 +1,277 @@
+import logging
+import os
+import threading
 import streamlit as st
 import pandas as pd
-from huggingface_hub import InferenceApi
+import requests
+from huggingface_hub import InferenceClient, InferenceTimeoutError
 import plotly.express as px
+from plotly_resampler import FigureResampler
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from data_readers import BUDGET_CSV, EXPENDITURE_CSV, INCOME_TAX_CSV, CSV_READERS, parquet_path_for
 
 # --- Page Configuration ---
 st.set_page_config(page_title="AI-Powered Policy Impact Analyzer", page_icon="🤖", layout="wide")
 
 # --- Hugging Face API Setup ---
-api = InferenceApi(repo_id="distilbert-base-cased-distilled-squad")
+QA_MODEL = "distilbert-base-cased-distilled-squad"
+QA_ONNX_DIR = "qa_onnx"  # int8 export written by export_qa_model.py
+QA_ONNX_FILE = os.path.join(QA_ONNX_DIR, "model_quantized.onnx")
+QA_CACHE_SIZE = 256  # per-question caches are shared by all sessions, so keep them bounded
 
-# Function to Query Hugging Face API
+# Create the client once per process instead of on every rerun. HTTP connections are not shared:
+# huggingface_hub keeps one requests.Session per thread and each Streamlit run uses a new thread.
+@st.cache_resource
+def get_hf_client():
+    return InferenceClient(model=QA_MODEL, timeout=30)
+
+# Function to send one tiny question so the hosted model is loaded; best effort, failures are ignored
+def send_warm_up_question(client):
+    try:
+        client.question_answering(question="hi", context="hi")
+    except Exception:
+        pass
+
+# Start the warm-up once per process in a background thread. The request can wait up to the client
+# timeout while the model loads, and must not hold up this or any other session's script run.
+@st.cache_resource(show_spinner=False)
+def warm_hf():
+    client = get_hf_client()
+    threading.Thread(target=send_warm_up_question, args=(client,), daemon=True).start()
+    return client
+
+# Load the local int8 ONNX model once, or None to fall back to the hosted API
+@st.cache_resource(show_spinner=False)
+def load_local_qa_pipeline():
+    if not os.path.isfile(QA_ONNX_FILE):  # missing or interrupted export
+        return None
+    try:
+        from optimum.onnxruntime import ORTModelForQuestionAnswering
+        from transformers import AutoTokenizer, pipeline
+    except ImportError:
+        return None
+    try:
+        model = ORTModelForQuestionAnswering.from_pretrained(QA_ONNX_DIR, file_name=os.path.basename(QA_ONNX_FILE))
+        tokenizer = AutoTokenizer.from_pretrained(QA_ONNX_DIR)
+    except Exception:
+        logging.getLogger(__name__).warning("Could not load %s, using the hosted API instead", QA_ONNX_FILE, exc_info=True)
+        return None
+    return pipeline("question-answering", model=model, tokenizer=tokenizer)
+
+# Function to Query Hugging Face API (repeated questions are answered from cache; errors are raised, not cached)
+@st.cache_data(show_spinner=False, max_entries=QA_CACHE_SIZE, ttl="1d")
 def query_hf_api(question, context):
-    payload = {"inputs": {"question": question, "context": context}}
-    result = api(payload)
-    return result.get("answer", "No answer found.")
+    qa_pipeline = load_local_qa_pipeline()
+    if qa_pipeline is not None:
+        result = qa_pipeline(question=question, context=context)
+        return result.get("answer") or "No answer found."
+    result = get_hf_client().question_answering(question=question, context=context)
+    return result.answer or "No answer found."
 
 # --- Load Data ---
+# Function to load a dataset from the Parquet copy written by build_cache.py when it is newer than
+# the CSV, otherwise from the CSV itself (both paths use the readers in data_readers.py)
+def read_dataset(file_path):
+    parquet_path = parquet_path_for(file_path)
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path):
+        return pd.read_parquet(parquet_path, dtype_backend="pyarrow")
+    return CSV_READERS[file_path](file_path)
+
 @st.cache_data
 def load_budget_data():
-    file_path = "Combined_Financial_Data.csv"  # Budget Data file
-    data = pd.read_csv(file_path)
+    data = read_dataset(BUDGET_CSV)
     return data
 
 @st.cache_data
 def load_expenditure_data():
-    file_path = "Expenditure.csv"  # Expenditure Data file
-    data = pd.read_csv(file_path)
+    data = read_dataset(EXPENDITURE_CSV)
     return data
 
 @st.cache_data
 def load_income_tax_data():
-    file_path = "Income Tax.csv"  # Income Tax Data file
-    data = pd.read_csv(file_path)
+    data = read_dataset(INCOME_TAX_CSV)
     return data
 
+# --- Derived Views ---
+# Helpers that take a _data frame are read-only st.cache_resource entries keyed by their other arguments (_data is not hashed)
+
+# Function to list the distinct values of a column
+@st.cache_resource(show_spinner=False)
+def unique_values(name, _data, column):
+    return _data[column].dropna().unique().tolist()
+
+# Function to split a dataset into one frame per column value, so filtering is a dict lookup
+@st.cache_resource(show_spinner=False)
+def index_by(name, _data, column):
+    return {value: group for value, group in _data.groupby(column, sort=False)}
+
+# --- Question Answering Context ---
+# Function to write a row as compact "column: value" text (blank-header columns keep just the value)
+def format_row(columns, values):
+    return ", ".join(
+        str(val) if str(col).startswith("Unnamed:") else f"{col}: {val}"
+        for col, val in zip(columns, values)
+        if pd.notna(val)
+    )
+
+# Held as a resource so the fitted vectorizer and matrix are not pickled and copied on every question
+@st.cache_resource(show_spinner=False)
+def build_qa_index():
+    # Flatten every row of every dataset into text once, streaming rows as tuples
+    # so no per-dataset list of row dicts is held alongside the texts
+    row_texts = []
+    for data in (load_budget_data(), load_expenditure_data(), load_income_tax_data()):
+        row_texts.extend(format_row(data.columns, values) for values in data.itertuples(index=False, name=None))
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(row_texts)
+    return row_texts, vectorizer, matrix
+
+# Function to pick only the rows relevant to the question (DistilBERT reads at most 512 tokens);
+# returns "" when no row shares a term with the question
+@st.cache_data(show_spinner=False, max_entries=QA_CACHE_SIZE)
+def retrieve_context(question, top_k=5, max_chars=1800):
+    row_texts, vectorizer, matrix = build_qa_index()
+    scores = cosine_similarity(vectorizer.transform([question]), matrix).ravel()
+    top_rows = [row_texts[i] for i in scores.argsort()[::-1][:top_k] if scores[i] > 0]
+    return "\n".join(top_rows)[:max_chars]
+
+# --- Chart Helpers ---
+MAX_LINE_POINTS = 1000
+MAX_PIE_SLICES = 20
+
+# Function to downsample long line charts (LTTB) so only ~1000 points reach the browser
+def downsample_line_chart(fig, data, x_axis):
+    x_values = data[x_axis]
+    if len(data) <= MAX_LINE_POINTS:
+        return fig
+    if not (pd.api.types.is_numeric_dtype(x_values) or pd.api.types.is_datetime64_any_dtype(x_values)):
+        return fig  # plotly-resampler needs an ordered x-axis
+    if x_values.isna().any() or not x_values.is_monotonic_increasing:
+        return fig  # ...and rejects x values that are missing or not sorted
+    return FigureResampler(fig, default_n_shown_samples=MAX_LINE_POINTS)
+
+# Function to parse a column as numbers; anything unparsable becomes NaN
+def to_numbers(values):
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+# Function to list the columns that can go on a numeric axis (text columns count if most values parse as numbers)
+@st.cache_resource(show_spinner=False)
+def numeric_columns(name, selection, _data):
+    columns = []
+    for col in _data.columns:
+        if pd.api.types.is_numeric_dtype(_data[col]):
+            columns.append(col)
+        elif to_numbers(_data[col]).count() * 2 > _data[col].count():
+            columns.append(col)
+    return columns
+
+# Function to keep the largest pie slices and fold the rest into "Other"
+def limit_pie_slices(data, names, values):
+    if names == values or not pd.api.types.is_numeric_dtype(data[values]):
+        return data
+    totals = data.groupby(names)[values].sum()
+    if len(totals) <= MAX_PIE_SLICES:
+        return data
+    top_slices = totals.nlargest(MAX_PIE_SLICES)
+    top_slices["Other"] = top_slices.get("Other", 0) + totals.drop(top_slices.index).sum()  # add to a real "Other" slice
+    return top_slices.rename_axis(names).reset_index()
+
+# --- Table Display ---
+PAGE_SIZE = 500
+
+# Function to send a large table to the browser one page at a time
+def show_paginated_table(data, key):
+    if len(data) <= PAGE_SIZE:
+        st.dataframe(data)
+        return
+    page_count = (len(data) + PAGE_SIZE - 1) // PAGE_SIZE
+    page = st.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=1, key=key)
+    st.dataframe(data.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
+
+# --- Visualization ---
+# Function to build a chart once per (data, chart type, axes); reruns with the same selection reuse the figure
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_chart(data_to_plot, chart_type, x_axis, y_axis, label):
+    data_to_plot = data_to_plot.assign(**{y_axis: to_numbers(data_to_plot[y_axis])})
+    if chart_type == "Bar Chart":
+        return px.bar(data_to_plot, x=x_axis, y=y_axis, title=f"Bar Chart for {label}")
+    if chart_type == "Line Chart":
+        return downsample_line_chart(px.line(data_to_plot, x=x_axis, y=y_axis, title=f"Line Chart for {label}"), data_to_plot, x_axis)
+    return px.pie(limit_pie_slices(data_to_plot, x_axis, y_axis), names=x_axis, values=y_axis, title=f"Pie Chart for {label}")
+
+# Chart options only rerun this fragment, not data loading or the question answering below
+@st.fragment
+def visualize_data(name, data_to_plot, label):
+    chart_type = st.selectbox("Choose a chart type", ["Bar Chart", "Line Chart", "Pie Chart"])
+    x_axis = st.selectbox("Select X-axis", data_to_plot.columns)
+    y_options = [col for col in numeric_columns(name, label, data_to_plot) if col != x_axis]
+    if not y_options:
+        st.info("No numeric columns to plot against this X-axis.")
+        return
+    y_axis = st.selectbox("Select Y-axis", y_options)
+
+    fig = build_chart(data_to_plot, chart_type, x_axis, y_axis, label)
+    st.plotly_chart(fig)
+
+# --- Dataset View ---
+# Function to show one dataset: pick a value of its key column, show the matching rows, then chart them
+def render_dataset(name, dataset):
+    data, key_col = dataset["data"], dataset["key_col"]
+    st.subheader(f"{dataset['icon']} {name}")
+
+    # Display column names
+    st.write(f"**Columns in {name}:**")
+    st.write(data.columns)
+
+    options = unique_values(name, data, key_col)
+    if dataset["full_table"]:
+        options = ["Show Full Table"] + options  # Add "Show Full Table" to the dropdown
+    selected = st.selectbox(dataset["select_label"], options=options)
+
+    # Show filtered data or full table
+    if selected == "Show Full Table":
+        st.write(f"### Complete {name}")
+        data_to_plot = data
+        show_paginated_table(data_to_plot, key=f"{name} page")
+    else:
+        st.write(f"### Filtered Data for: {selected}")
+        data_to_plot = index_by(name, data, key_col)[selected]
+        st.dataframe(data_to_plot)
+
+    # Visualization Section
+    st.subheader(f"📊 Visualize the {name} for: {selected if selected != 'Show Full Table' else 'Complete Data'}")
+    visualize_data(name, data_to_plot, selected)
+
 # Load Data
 budget_data = load_budget_data()
 expenditure_data = load_expenditure_data()
 income_tax_data = load_income_tax_data()
 
+DATASETS = {
+    "Budget Data": {
+        "data": budget_data,
+        "key_col": "Source",
+        "icon": "📋",
+        "select_label": "Select a Source to View Budget Data",
+        "full_table": False,
+    },
+    "Expenditure Data": {
+        "data": expenditure_data,
+        "key_col": expenditure_data.columns[0],
+        "icon": "📋",
+        "select_label": "Select an Item Group (State/Region) to View Expenditure Data",
+        "full_table": True,
+    },
+    "Income Tax Data": {
+        "data": income_tax_data,
+        "key_col": income_tax_data.columns[0],
+        "icon": "📉",
+        "select_label": "Select a Category to View Income Tax Data",
+        "full_table": True,
+    },
+}
+
 # --- App Layout ---
 st.title("🤖 AI-Powered Policy Impact Analyzer")
 st.write("""
@@ -48,120 +281,32 @@ Switch between datasets and explore insights dynamically.
 st.markdown("---")
 
 # --- Dataset Type Dropdown ---
-dataset_type = st.selectbox("Select Dataset Type", ["Budget Data", "Expenditure Data", "Income Tax Data"])
-
-if dataset_type == "Budget Data":
-    st.subheader("📋 Budget Data")
-    # Source Dropdown for Budget Data
-    budget_sources = budget_data["Source"].dropna().unique()  # Get unique sources
-    selected_budget_source = st.selectbox("Select a Source to View Budget Data", options=budget_sources)
-    
-    # Filter and Display Budget Data
-    filtered_budget_data = budget_data[budget_data["Source"] == selected_budget_source]
-    st.dataframe(filtered_budget_data)
-    
-    # Visualization Section for Budget Data
-    st.subheader(f"📊 Visualize the Budget Data for Source: {selected_budget_source}")
-    chart_type = st.selectbox("Choose a chart type", ["Bar Chart", "Line Chart", "Pie Chart"])
-    x_axis = st.selectbox("Select X-axis", filtered_budget_data.columns)
-    y_axis = st.selectbox("Select Y-axis", filtered_budget_data.columns)
-
-    if chart_type == "Bar Chart":
-        fig = px.bar(filtered_budget_data, x=x_axis, y=y_axis, title=f"Bar Chart for {selected_budget_source}")
-        st.plotly_chart(fig)
-    elif chart_type == "Line Chart":
-        fig = px.line(filtered_budget_data, x=x_axis, y=y_axis, title=f"Line Chart for {selected_budget_source}")
-        st.plotly_chart(fig)
-    elif chart_type == "Pie Chart":
-        fig = px.pie(filtered_budget_data, names=x_axis, values=y_axis, title=f"Pie Chart for {selected_budget_source}")
-        st.plotly_chart(fig)
-
-elif dataset_type == "Expenditure Data":
-    st.subheader("📋 Expenditure Data")
-    
-    # Display column names
-    st.write("**Columns in Expenditure Data:**")
-    st.write(expenditure_data.columns)
-    
-    # Add an option to view the entire table
-    item_groups = expenditure_data[expenditure_data.columns[0]].dropna().unique()
-    dropdown_options = ["Show Full Table"] + list(item_groups)  # Add "Show Full Table" to the dropdown
-    selected_item_group = st.selectbox("Select an Item Group (State/Region) to View Expenditure Data", options=dropdown_options)
-    
-    # Show filtered data or full table
-    if selected_item_group == "Show Full Table":
-        st.write("### Complete Expenditure Data")
-        st.dataframe(expenditure_data)
-    else:
-        filtered_expenditure_data = expenditure_data[expenditure_data[expenditure_data.columns[0]] == selected_item_group]
-        st.write(f"### Filtered Data for: {selected_item_group}")
-        st.dataframe(filtered_expenditure_data)
-    
-    # Visualization Section
-    st.subheader(f"📊 Visualize the Expenditure Data for: {selected_item_group if selected_item_group != 'Show Full Table' else 'Complete Data'}")
-    chart_type = st.selectbox("Choose a chart type", ["Bar Chart", "Line Chart", "Pie Chart"])
-    x_axis = st.selectbox("Select X-axis", expenditure_data.columns)
-    y_axis = st.selectbox("Select Y-axis", expenditure_data.columns)
+dataset_type = st.selectbox("Select Dataset Type", list(DATASETS))
+render_dataset(dataset_type, DATASETS[dataset_type])
 
-    # Adjust visualization logic
-    if selected_item_group == "Show Full Table":
-        data_to_plot = expenditure_data
-    else:
-        data_to_plot = filtered_expenditure_data
-    
-    if chart_type == "Bar Chart":
-        fig = px.bar(data_to_plot, x=x_axis, y=y_axis, title=f"Bar Chart for {selected_item_group}")
-        st.plotly_chart(fig)
-    elif chart_type == "Line Chart":
-        fig = px.line(data_to_plot, x=x_axis, y=y_axis, title=f"Line Chart for {selected_item_group}")
-        st.plotly_chart(fig)
-    elif chart_type == "Pie Chart":
-        fig = px.pie(data_to_plot, names=x_axis, values=y_axis, title=f"Pie Chart for {selected_item_group}")
-        st.plotly_chart(fig)
-
-elif dataset_type == "Income Tax Data":
-    st.subheader("📉 Income Tax Data")
-    
-    # Display column names
-    st.write("**Columns in Income Tax Data:**")
-    st.write(income_tax_data.columns)
-    
-    # Add an option to view the entire table
-    categories = income_tax_data[income_tax_data.columns[0]].dropna().unique()
-    dropdown_options = ["Show Full Table"] + list(categories)  # Add "Show Full Table" to the dropdown
-    selected_category = st.selectbox("Select a Category to View Income Tax Data", options=dropdown_options)
-    
-    # Show filtered data or full table
-    if selected_category == "Show Full Table":
-        st.write("### Complete Income Tax Data")
-        st.dataframe(income_tax_data)
-    else:
-        filtered_income_tax_data = income_tax_data[income_tax_data[income_tax_data.columns[0]] == selected_category]
-        st.write(f"### Filtered Data for: {selected_category}")
-        st.dataframe(filtered_income_tax_data)
-    
-    # Visualization Section
-    st.subheader(f"📊 Visualize the Income Tax Data for: {selected_category if selected_category != 'Show Full Table' else 'Complete Data'}")
-    chart_type = st.selectbox("Choose a chart type", ["Bar Chart", "Line Chart", "Pie Chart"])
-    x_axis = st.selectbox("Select X-axis", income_tax_data.columns)
-    y_axis = st.selectbox("Select Y-axis", income_tax_data.columns)
-
-    # Adjust visualization logic
-    if selected_category == "Show Full Table":
-        data_to_plot = income_tax_data
+# --- Ask a Question ---
+st.markdown("---")
+st.subheader("💬 Ask a Question About the Data")
+with st.form("qa_form"):
+    question = st.text_input("Enter your question")
+    st.form_submit_button("Ask")
+if question:
+    context = retrieve_context(question)
+    if not context:
+        st.info("No relevant rows found in the data for this question.")
     else:
-        data_to_plot = filtered_income_tax_data
-    
-    if chart_type == "Bar Chart":
-        fig = px.bar(data_to_plot, x=x_axis, y=y_axis, title=f"Bar Chart for {selected_category}")
-        st.plotly_chart(fig)
-    elif chart_type == "Line Chart":
-        fig = px.line(data_to_plot, x=x_axis, y=y_axis, title=f"Line Chart for {selected_category}")
-        st.plotly_chart(fig)
-    elif chart_type == "Pie Chart":
-        fig = px.pie(data_to_plot, names=x_axis, values=y_axis, title=f"Pie Chart for {selected_category}")
-        st.plotly_chart(fig)
+        try:
+            answer = query_hf_api(question, context)
+            st.write(f"**Answer:** {answer}")
+        except InferenceTimeoutError:
+            st.warning("The model is still loading on Hugging Face. Please ask again in a few seconds.")
+        except requests.RequestException as error:  # HfHubHTTPError (bad token, HTTP errors) and connection failures
+            st.error(f"Could not get an answer from Hugging Face: {error}")
 
 # Footer
 st.markdown("---")
 st.write("**Developed with ❤️ using Streamlit, Pandas, Plotly, and Hugging Face API**")
+
+# Warm up the question-answering model after the page has rendered, so the first question skips the cold start
+if load_local_qa_pipeline() is None:
+    warm_hf()
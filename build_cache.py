@@ -0,0 +1,9 @@
+# Convert the app's CSV files to Snappy-compressed Parquet so app.py can skip CSV parsing on cold start.
+# Re-run after editing any of the CSV files; app.py ignores a Parquet file older than its CSV.
+from data_readers import CSV_READERS, parquet_path_for
+
+for file_path, read_csv in CSV_READERS.items():
+    parquet_path = parquet_path_for(file_path)
+    data = read_csv(file_path)
+    data.to_parquet(parquet_path, compression="snappy", index=False)
+    print(f"{file_path} -> {parquet_path} ({len(data)} rows)")
@@ -0,0 +1,37 @@
+# CSV readers shared by app.py and build_cache.py, so the Parquet cache and the CSV
+# fallback always produce the same frames.
+import os
+
+import pandas as pd
+from pyarrow import csv as pacsv
+
+BUDGET_CSV = "Combined_Financial_Data.csv"  # Budget Data file
+EXPENDITURE_CSV = "Expenditure.csv"  # Expenditure Data file
+INCOME_TAX_CSV = "Income Tax.csv"  # Income Tax Data file
+
+
+def read_arrow_csv(file_path):
+    return pd.read_csv(file_path, engine="pyarrow", dtype_backend="pyarrow")
+
+
+def read_income_tax_csv(file_path):
+    # Several stacked tables: let Arrow's multi-threaded reader skip rows with the wrong number of fields
+    table = pacsv.read_csv(
+        file_path,
+        parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: "skip"),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+    )
+    # Name blank header cells the way pd.read_csv does ("Unnamed: 1", ...)
+    table = table.rename_columns([name or f"Unnamed: {i}" for i, name in enumerate(table.column_names)])
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+CSV_READERS = {
+    BUDGET_CSV: read_arrow_csv,
+    EXPENDITURE_CSV: read_arrow_csv,
+    INCOME_TAX_CSV: read_income_tax_csv,
+}
+
+
+def parquet_path_for(file_path):
+    return os.path.splitext(file_path)[0] + ".parquet"
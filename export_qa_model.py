@@ -0,0 +1,22 @@
+# Export the question-answering model to ONNX with int8 dynamic quantization.
+# app.py picks up ./qa_onnx automatically and runs it locally instead of calling the hosted API.
+# Requires: pip install "optimum[onnxruntime]" transformers
+import os
+
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.onnxruntime import ORTModelForQuestionAnswering
+from transformers import AutoTokenizer
+
+MODEL_ID = "distilbert-base-cased-distilled-squad"
+OUTPUT_DIR = "qa_onnx"
+
+model = ORTModelForQuestionAnswering.from_pretrained(MODEL_ID, export=True)
+model.save_pretrained(OUTPUT_DIR)
+AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(OUTPUT_DIR)
+
+quantize_dynamic(
+    os.path.join(OUTPUT_DIR, "model.onnx"),
+    os.path.join(OUTPUT_DIR, "model_quantized.onnx"),
+    weight_type=QuantType.QInt8,
+)
+print(f"Quantized model written to {OUTPUT_DIR}/model_quantized.onnx")